@@ -10,24 +10,36 @@
     - analytics_vibration_sensors.json ->
         list of vibration sensors to be monitored with z-score anomaly detection
 """
-import json
+import asyncio
 import os
 import math
 import logging
-from datetime import datetime, UTC
-from fastapi import FastAPI, Request
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
+import orjson
 import influxdb_client
+from influxdb_client import WritePrecision
 from influxdb_client.client.write_api import WriteOptions
-from helper import AnomalyDetectionZscore
+from helper import (
+    AnomalyDetectionZscore, 
+    LineProtocolTemplate, 
+    init_analytics_worker, 
+    update_analytics, 
+    update_worker_analytics
+)
 
 
 # Set loging system
-LOG_FORMAT = "%(levelname)s %(asctime)s \
-    Function: %(funcName)s \
-    Line: %(lineno)d \
-    Message: %(message)s"
+LOG_FORMAT = "%(levelname)s %(asctime)s %(message)s"
+# no caller frame / process / thread lookup for every log record
+logging._srcfile = None
+logging.logProcesses = False
+logging.logThreads = False
 logging.basicConfig(level=logging.INFO, format=LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
@@ -106,6 +118,10 @@ INFLUX_URL = "http://" + INFLUX_HOST + ":" + INFLUX_PORT
 
 FLASK_PORT = get_env_var("FLASK_PORT", int)
 
+# Number of uvicorn worker processes. Every worker keeps its own anomaly
+# detection models, so more than 1 worker splits sensor data between models
+UVICORN_WORKERS = get_env_var("UVICORN_WORKERS", int, default=1)
+
 logger.info("INFLUX_URL value is:  %s", INFLUX_URL)
 
 # Threshold for z-score value. Point above this threshold is treated as anomaly
@@ -117,8 +133,18 @@ MODEL_WINDOW_SIZE = get_env_var("MODEL_WINDOW_SIZE", int, default=25)
 # Number of anomaly point in list to calculate anomaly ration
 ANOMALY_LIST_SIZE = get_env_var("ANOMALY_LIST_SIZE", int, default=25)
 
+# Max number of data points waiting in queue to be written to InfluxDB
+WRITE_QUEUE_SIZE = get_env_var("WRITE_QUEUE_SIZE", int, default=10000)
+
+# Max number of queued data points passed to InfluxDB in one write call
+WRITE_QUEUE_BATCH = get_env_var("WRITE_QUEUE_BATCH", int, default=512)
+
+# Number of worker processes for anomaly detection. 0 = anomaly detection 
+# runs in the server process. Every sensor is owned by exactly one worker
+ANALYTICS_WORKERS = get_env_var("ANALYTICS_WORKERS", int, default=0)
+
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['null'],
@@ -126,27 +152,101 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT"],
     allow_headers=['*'])
 
+# Line protocol of data points stored in InfluxDB
+GENERIC_STATE_LINE = LineProtocolTemplate(
+    "GenericState",
+    ("line_name", "machine_name", "state_name"),
+    ("value",)
+)
+GENERIC_SENSOR_LINE = LineProtocolTemplate(
+    "GenericSensor",
+    ("line_name", "machine_name", "sensor_name"),
+    ("value",)
+)
+SENSOR_ANALYTICS_LINE = LineProtocolTemplate(
+    "SingleSensorAnalytics",
+    ("line_name", "machine_name", "sensor_name"),
+    ("value", "anomaly", "anomaly_ratio", "model_avg", "z_score", "z_score_thresh")
+)
+VIB_SENSOR_LINE = LineProtocolTemplate(
+    "VibSensor",
+    ("line_name", "machine_name", "sensor_name"),
+    ("vib_accel_rms_x", "vib_accel_rms_y", "vib_accel_rms_z", "vib_accel_rms_total",
+     "anomaly", "anomaly_ratio", "model_avg", "z_score", "z_score_thresh")
+)
+
 # Just simulation of MES data
 production_orders = [
     {"id": 1, "order_no": 100, "product_key": "900.000.002"}
 ]
+# production order is static, serialize it only once
+PRODUCTION_ORDER_JSON = orjson.dumps(production_orders[0])
+
 
+# sensors on which z-score anomaly detection is applied and set of them 
+# for fast lookup in HTTP handlers (filled at startup by `init_app`)
+app.generic_sensors_for_analytics = []
+app.generic_sensors_for_analytics_set = set()
+app.vibration_sensors_for_analytics = []
+app.vibration_sensors_for_analytics_set = set()
 
 # key=sensor name;  value=object of class 'AnomalyDetectionZscore' for z-score anomaly detection
 app.generic_analytics_objects = {}
 app.vibration_analytics_objects = {}
 
+# key=sensor name;  value=single process executor which owns anomaly detection of the sensor
+# (filled at startup only if ANALYTICS_WORKERS > 0)
+app.generic_analytics_executors = {}
+app.vibration_analytics_executors = {}
+# key=executor;  value=list of (sensor group, sensor name) owned by the executor
+app.analytics_executors = {}
+
+# Worker processes are started fresh (not forked), because the server process
+# already runs InfluxDB client threads. A spawned worker imports this script again,
+# therefore InfluxDB client and anomaly detection objects are created at startup
+# of the server (`init_app`), not at import
+ANALYTICS_MP_CONTEXT = multiprocessing.get_context("spawn")
+
+# Results of anomaly detection if it failed, these fields are skipped in InfluxDB
+NO_ANALYTICS_RESULTS = (None, None, None, None, None)
+
+
+def load_sensor_list(file_path: str) -> list:
+    """
+    Read list of sensors for anomaly detection from JSON file
+    in format {"sensors": ["name1", "name2", ...]}
+     Args:
+        file_path (str): path to JSON file
+     Returns:
+        list: sensor names, empty list if file cannot be read or is not valid
+    """
+    try:
+        with open(file_path, "rb") as file:
+            config = orjson.loads(file.read())
+
+        sensors = config.get("sensors") if isinstance(config, dict) else None
+        if not isinstance(sensors, list) or not all(isinstance(name, str) for name in sensors):
+            raise ValueError('"sensors" must be a list of sensor names')
+
+    except Exception as e:
+        logger.error("Cannot read sensor list from json file %s. Result code: %s", file_path, e)
+        return []
+
+    return sensors
+
+
 def init_app():
     """
     Initial configuration of InfluxDB connection and 
-    declaration of anomaly detection objects
+    declaration of anomaly detection objects.
+    Called at startup of the server, not at import of the module
     """
 
     # Configure connection with InfluxDB database
     try:
         logger.info("Configuring InfluxDB client ")
         app.influx_client = influxdb_client.InfluxDBClient(
-            url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG, enable_gzip=False
+            url=INFLUX_URL, token=INFLUX_TOKEN, org=INFLUX_ORG, enable_gzip=True
         )
 
         logger.info("Configuring InfluxDB write api")
@@ -155,21 +255,24 @@ def init_app():
                                     jitter_interval=INFLUX_JITTER_INTERVAL,
                                     retry_interval=1000)
 
+        # single write api reused for all requests, so that the client's
+        # batching (batch_size / flush_interval / jitter_interval) is effective
+        app.write_api = app.influx_client.write_api(write_options=app.write_options)
+
     except Exception as e:
         logger.error("Configuring InfluxDB failed. Error code/reason: %s", e)
+        raise SystemExit
 
+    # data points from HTTP handlers are queued here and written to InfluxDB
+    # by background task, so that handlers do not wait for InfluxDB
+    app.write_queue = asyncio.Queue(maxsize=WRITE_QUEUE_SIZE)
 
-    # Get list of generic sensors for anomaly detection from JSON file
-    try:
-        with open("./analytics_generic_sensors.json") as file:
-            generic_sensors_for_analytics = json.load(file)
 
-            # proceed only if number of sensors not zero
-            if len(generic_sensors_for_analytics["sensors"]) > 0:
-                # generic sensors on which z-score anomaly detection is applied
-                app.generic_sensors_for_analytics = generic_sensors_for_analytics["sensors"]
-    except Exception as e:
-        logger.error("Cannot open json file with generic sensor list. Result code: %s", e)
+    # Get list of generic sensors for anomaly detection from JSON file
+    # generic sensors on which z-score anomaly detection is applied
+    app.generic_sensors_for_analytics[:] = load_sensor_list("./analytics_generic_sensors.json")
+    # set for fast lookup in HTTP handlers (same object as bound in HTTP handler)
+    app.generic_sensors_for_analytics_set.update(app.generic_sensors_for_analytics)
 
 
     # Create analytics objects for generic sensors
@@ -180,6 +283,7 @@ def init_app():
                                                             analytic_obj,
                                                             MODEL_WINDOW_SIZE,
                                                             ANOMALY_LIST_SIZE,
+                                                            Z_SCORE_THRESHOLD,
                                                             logger
                                                             )
         except Exception as e:
@@ -188,16 +292,10 @@ def init_app():
 
 
     # Get list of vibration sensors for anomaly detection from JSON file
-    try:
-        with open("./analytics_vibration_sensors.json") as file:
-            vibration_sensors_for_analytics = json.load(file)
-
-            # proceed only if number of sensors not zero
-            if len(vibration_sensors_for_analytics["sensors"]) > 0:
-                # vibration sensors on which z-score anomaly detection is applied
-                app.vibration_sensors_for_analytics = vibration_sensors_for_analytics["sensors"]
-    except Exception as e:
-        logger.error("Cannot open json file with generic sensor list. Result code: %s", e)
+    # vibration sensors on which z-score anomaly detection is applied
+    app.vibration_sensors_for_analytics[:] = load_sensor_list("./analytics_vibration_sensors.json")
+    # set for fast lookup in HTTP handlers (same object as bound in HTTP handler)
+    app.vibration_sensors_for_analytics_set.update(app.vibration_sensors_for_analytics)
 
 
     # Create analytics objects for vibration sensors
@@ -208,6 +306,7 @@ def init_app():
                                                             analytic_obj,
                                                             MODEL_WINDOW_SIZE,
                                                             ANOMALY_LIST_SIZE,
+                                                            Z_SCORE_THRESHOLD,
                                                             logger
                                                             )
         except Exception as e:
@@ -215,29 +314,167 @@ def init_app():
                           Error code/reason: %s", analytic_obj, e)
 
 
-def write_to_influx(influx_measurement, influx_point):
+def write_to_influx(influx_point):
     """
     Write data to InfluxDB database
+     Args:
+        influx_point (bytes | list): data point(s) in line protocol with ms timestamp
+    """
+    try:
+        app.write_api.write(bucket=INFLUX_BUCKET_NAME, org=INFLUX_ORG, record=influx_point,
+                            write_precision=WritePrecision.MS)
+    except Exception as e:
+        logger.error("Send data to InfluxDB failed. Error code/reason: %s", e)
+
+
+def queue_to_influx(influx_measurement, influx_point):
+    """
+    Put data point into write queue without waiting. 
+    Data point is dropped if queue is full.
      Args:
         influx_measurement (str): name of measurement
-        influx_point (influxdb_client.Point): data point to be written to InfluxDB  
+        influx_point (bytes | None): data point in line protocol to be written to InfluxDB,
+                                     None if data point has no valid field
     """
+    if influx_point is None:
+        logger.error("Data point of %s has no valid field and is not stored", 
+                     influx_measurement)
+        return
+
     try:
-        measurement = influx_measurement
-        point = influx_point
+        app.write_queue.put_nowait(influx_point)
+    except asyncio.QueueFull:
+        logger.error("InfluxDB write queue is full. Data point of %s dropped", 
+                     influx_measurement)
+
+
+async def drain_write_queue():
+    """
+    Background task which takes data points from write queue 
+    and writes them to InfluxDB. All points already waiting in queue 
+    (up to `WRITE_QUEUE_BATCH`) are written in one call.
+    """
+    while True:
+        batch = [await app.write_queue.get()]
+        while len(batch) < WRITE_QUEUE_BATCH:
+            try:
+                batch.append(app.write_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        write_to_influx(batch)
+        for _ in batch:
+            app.write_queue.task_done()
+
 
-        with app.influx_client.write_api(write_options=app.write_options) as write_api:
-            write_api.write(INFLUX_BUCKET_NAME, INFLUX_ORG, point)
+@app.on_event("startup")
+async def startup_init_app():
+    """
+    Configure InfluxDB connection and anomaly detection objects
+    """
+    init_app()
+
+
+@app.on_event("startup")
+async def start_write_queue():
+    """
+    Start background task writing queued data points to InfluxDB
+    """
+    app.drain_task = asyncio.create_task(drain_write_queue())
+
+
+def start_analytics_worker(worker_keys: list) -> ProcessPoolExecutor:
+    """
+    Start worker process owning anomaly detection of given sensors
+     Args:
+        worker_keys (list): (sensor group, sensor name) of sensors owned by the worker
+    """
+    group_executors = {
+        "generic": app.generic_analytics_executors,
+        "vibration": app.vibration_analytics_executors,
+    }
+
+    logger.info("Starting anomaly detection worker for %s", worker_keys)
+    executor = ProcessPoolExecutor(
+        max_workers=1,
+        mp_context=ANALYTICS_MP_CONTEXT,
+        initializer=init_analytics_worker,
+        initargs=(worker_keys, MODEL_WINDOW_SIZE, ANOMALY_LIST_SIZE, Z_SCORE_THRESHOLD)
+    )
+    # first submitted task starts the process now, not in the first HTTP request
+    executor.submit(os.getpid)
+
+    app.analytics_executors[executor] = worker_keys
+    for group, name in worker_keys:
+        group_executors[group][name] = executor
+    return executor
+
+
+def restart_analytics_worker(executor: ProcessPoolExecutor):
+    """
+    Replace broken worker process by new one. Anomaly detection models 
+    of its sensors are built again from new data
+     Args:
+        executor (ProcessPoolExecutor): executor of broken worker process
+    """
+    worker_keys = app.analytics_executors.pop(executor, None)
+    if worker_keys is None:
+        # already restarted by another request
+        return
 
+    executor.shutdown(wait=False, cancel_futures=True)
+    start_analytics_worker(worker_keys)
+
+
+@app.on_event("startup")
+async def start_analytics_workers():
+    """
+    Start worker processes for anomaly detection. Sensors are split between 
+    workers, each worker keeps anomaly detection objects of its own sensors
+    """
+    if ANALYTICS_WORKERS <= 0:
+        return
+
+    sensor_keys = (
+        [("generic", name) for name in app.generic_analytics_objects]
+        + [("vibration", name) for name in app.vibration_analytics_objects]
+    )
+
+    for worker in range(ANALYTICS_WORKERS):
+        worker_keys = sensor_keys[worker::ANALYTICS_WORKERS]
+        if not worker_keys:
+            break
+        start_analytics_worker(worker_keys)
+
+
+@app.on_event("shutdown")
+async def shutdown_influx():
+    """
+    Write remaining queued data points, flush them 
+    and close connection with InfluxDB
+    """
+    try:
+        for executor in list(app.analytics_executors):
+            executor.shutdown(cancel_futures=True)
     except Exception as e:
-        logger.error("Send data to InfluxDB failed. Error code/reason: %s", e)
+        logger.error("Stopping anomaly detection workers failed. Error code/reason: %s", e)
 
-init_app()
+    try:
+        app.drain_task.cancel()
+        remaining = []
+        while not app.write_queue.empty():
+            remaining.append(app.write_queue.get_nowait())
+        if remaining:
+            write_to_influx(remaining)
+        app.write_api.close()
+        app.influx_client.close()
+    except Exception as e:
+        logger.error("Closing InfluxDB client failed. Error code/reason: %s", e)
 
 
-@app.get("/production_orders")
+@app.get("/production_orders", response_class=Response)
 async def get_production_orders():
-    return production_orders[0]
+    return Response(content=PRODUCTION_ORDER_JSON, media_type="application/json")
 
 
 @app.post("/generic-state")
@@ -245,7 +482,7 @@ async def state_data(request: Request):
     """
     HTTP POST handler of data with generic state from machine
     """
-    data = await request.json()
+    data = orjson.loads(await request.body())
 
     if not data:
         return {"error": "No data provided"}, 400
@@ -261,157 +498,174 @@ async def state_data(request: Request):
     else:
         # store data in InfluxDB
         measurement = "GenericState"
-        point = (
-            influxdb_client.Point(measurement)
-            .tag("line_name", str(data["LineName"]))
-            .tag("machine_name", str(data["MachineName"]))
-            .tag("state_name", str(state_name))
-            .field("value", int(state_value))
-            .time(time=datetime.fromtimestamp(int(data["TimeStamp"]) / 1000, UTC),
-                write_precision='ms')
+        point = GENERIC_STATE_LINE.build(
+            (data["LineName"], data["MachineName"], state_name),
+            (int(state_value),),
+            int(data["TimeStamp"])
         )
-        write_to_influx(measurement, point)
+        queue_to_influx(measurement, point)
 
     return {"Message": "State read successfully"}, 201
 
 
-@app.post("/generic-sensor")
-async def sensor_data(request: Request):
+def read_generic_sensor(data: dict) -> tuple:
     """
-    HTTP POST handler for data with generic sensor from machine
+    Read generic sensor data from Json Body of HTTP POST
+     Args:
+        data (dict): Json Body of HTTP POST
+     Returns:
+        tuple: sensor field values to be stored in InfluxDB,
+               value for z-score anomaly detection (magnitude of sensor value)
     """
-    data = await request.json()
+    sensor_value = data["SensorValue"]
+    fields = (float(sensor_value),)
 
-    if not data:
-        return {"error": "No data provided"}, 400
-
-    # Validate the incoming data
-    try:
-        sensor_name = data["SensorName"]
-        sensor_value = data["SensorValue"]
-    except Exception as e:
-        logger.error("No valid sensor data in Json Body of HTTP POST included, error: %s", e)
-    else:
-        # apply z-score anomaly detection analytics on sensor data
-        # and store results in InfluxDB
-        if sensor_name in app.generic_sensors_for_analytics:
-            logger.debug("Sensor name: %s ", sensor_name)
-            app.generic_analytics_objects[sensor_name].z_score_thresh = Z_SCORE_THRESHOLD
-            app.generic_analytics_objects[sensor_name].check_if_anomaly(sensor_value)
-            app.generic_analytics_objects[sensor_name].calculate_anomaly_ratio()
-
-            measurement = "SingleSensorAnalytics"
-            point = (
-                influxdb_client.Point(measurement)
-                .tag("line_name", str(data["LineName"]))
-                .tag("machine_name", str(data["MachineName"]))
-                .tag("sensor_name", str(data["SensorName"]))
-                .field("value", float(round(data["SensorValue"], 4)))
-                .field("anomaly", int(app.generic_analytics_objects[sensor_name].anomaly))
-                .field("anomaly_ratio", round(float(app.generic_analytics_objects[sensor_name].anomaly_ratio), 4))
-                .field("model_avg", round(float(app.generic_analytics_objects[sensor_name].model_avg), 4))
-                .field("z_score", round(float(app.generic_analytics_objects[sensor_name].z_score), 4))
-                .field("z_score_thresh", round(float(app.generic_analytics_objects[sensor_name].z_score_thresh), 4))
-                .time(time=datetime.fromtimestamp(int(data["TimeStamp"]) / 1000, UTC),
-                    write_precision='ms')
-            )
-        # only store sensor data in InfluxDB (no analytics)
-        else:
-            measurement = "GenericSensor"
-            point = (
-                influxdb_client.Point(measurement)
-                .tag("line_name", str(data["LineName"]))
-                .tag("machine_name", str(data["MachineName"]))
-                .tag("sensor_name", str(data["SensorName"]))
-                .field("value", float(round(data["SensorValue"], 4)))
-                .time(time=datetime.fromtimestamp(int(data["TimeStamp"]) / 1000, UTC),
-                    write_precision='ms')
-            )
+    # anomaly detection works on magnitude of sensor value
+    if sensor_value < 0:
+        sensor_value = -sensor_value
+    return fields, sensor_value
 
-        # store results in InfluxDB
-        write_to_influx(measurement, point)
 
-    # POST request successfully processed
-    return {"Message": "Sensor read successfully"}, 201
-
-
-@app.post("/vibration-sensor")
-async def vibration_sensor_data(request: Request):
+def read_vibration_sensor(data: dict) -> tuple:
     """
-    HTTP POST handler for data from vibration sensor
+    Read vibration sensor data from Json Body of HTTP POST
+     Args:
+        data (dict): Json Body of HTTP POST
+     Returns:
+        tuple: sensor field values to be stored in InfluxDB,
+               value for z-score anomaly detection (total rms)
     """
-
-    data = await request.json()
-
-    if not data:
-        return {"error": "No data provided"}, 400
-
-    # Validate the incoming data
-    try:
-        sensor_name = data["SensorName"]
-        vib_accel_tot_rms_x = data["VibAccelTotRmsX"]
-        vib_accel_tot_rms_y = data["VibAccelTotRmsY"]
-        vib_accel_tot_rms_z = data["VibAccelTotRmsZ"]
+    vib_accel_tot_rms_x = data["VibAccelTotRmsX"]
+    vib_accel_tot_rms_y = data["VibAccelTotRmsY"]
+    vib_accel_tot_rms_z = data["VibAccelTotRmsZ"]
+    if logger.isEnabledFor(logging.DEBUG):
         logger.debug("sensor name: %s \
                     vib accel x axis: %s \
                     vib accel y axis: %s \
                     vib accel z axis: %s",
-                    sensor_name, 
+                    data["SensorName"], 
                     vib_accel_tot_rms_x, 
                     vib_accel_tot_rms_y, 
                     vib_accel_tot_rms_z)
 
-    except Exception as e:
-        logger.error("No valid sensor data in Json Body of HTTP POST included, error: %s", e)
-    else:
+    # Calculate total rms
+    vib_total_rms = math.hypot(vib_accel_tot_rms_x, vib_accel_tot_rms_y, vib_accel_tot_rms_z)
+    fields = (float(vib_accel_tot_rms_x),
+              float(vib_accel_tot_rms_y),
+              float(vib_accel_tot_rms_z),
+              vib_total_rms)
+    return fields, vib_total_rms
+
+
+def make_sensor_route(group: str,
+                      analytics_objects: dict,
+                      analytics_executors: dict,
+                      sensors_for_analytics: set,
+                      read_sensor,
+                      analytics_line: LineProtocolTemplate,
+                      raw_line: LineProtocolTemplate | None = None):
+    """
+    Create HTTP POST handler for data from one type of sensor
+     Args:
+        group (str): name of sensor group, identifies sensors in analytics worker processes
+        analytics_objects (dict): key=sensor name; value=object of class 'AnomalyDetectionZscore'
+        analytics_executors (dict): key=sensor name; value=executor of analytics worker 
+                                    owning the sensor. Sensors not included here are 
+                                    evaluated in the server process
+        sensors_for_analytics (set): sensors on which z-score anomaly detection is applied
+        read_sensor (callable): returns sensor field values and value for anomaly detection 
+                                from Json Body, raises exception if data are not valid
+        analytics_line (LineProtocolTemplate): sensor fields with anomaly detection results
+        raw_line (LineProtocolTemplate): sensor fields only, used for sensors without 
+                                         anomaly detection. If None, these data are not stored
+    """
+
+    async def sensor_route(request: Request):
+        data = orjson.loads(await request.body())
+
+        if not data:
+            return {"error": "No data provided"}, 400
+
+        # Validate the incoming data
+        try:
+            sensor_name = data["SensorName"]
+            fields, analytics_value = read_sensor(data)
+        except Exception as e:
+            logger.error("No valid sensor data in Json Body of HTTP POST included, error: %s", e)
+            return {"Message": "Sensor read successfully"}, 201
+
+
         # apply z-score anomaly detection analytics on sensor data
         # and store results in InfluxDB
-        if sensor_name in app.vibration_sensors_for_analytics:
-            logger.debug("Sensor name: %s ", sensor_name)
-
-            # Calculate total rms
-            vib_total_rms = round(
-                float(
-                    math.sqrt(
-                    vib_accel_tot_rms_x ** 2
-                    + vib_accel_tot_rms_y ** 2
-                    + vib_accel_tot_rms_z ** 2
+        if sensor_name in sensors_for_analytics:
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Sensor name: %s ", sensor_name)
+            executor = analytics_executors.get(sensor_name)
+            if executor is None:
+                results = update_analytics(analytics_objects[sensor_name], analytics_value)
+            else:
+                try:
+                    results = await asyncio.get_running_loop().run_in_executor(
+                        executor, update_worker_analytics, (group, sensor_name), analytics_value
                     )
-                ),
-                5,
-            )
-            app.vibration_analytics_objects[sensor_name].z_score_thresh = Z_SCORE_THRESHOLD
-            app.vibration_analytics_objects[sensor_name].check_if_anomaly(vib_total_rms)
-            app.vibration_analytics_objects[sensor_name].calculate_anomaly_ratio()
-
-            measurement = "VibSensor"
-            point = (
-                influxdb_client.Point(measurement)
-                .tag("line_name", str(data["LineName"]))
-                .tag("machine_name", str(data["MachineName"]))
-                .tag("sensor_name", sensor_name)
-                .field("vib_accel_rms_x", round(vib_accel_tot_rms_x, 4))
-                .field("vib_accel_rms_y", round(vib_accel_tot_rms_y, 4))
-                .field("vib_accel_rms_z", round(vib_accel_tot_rms_z, 4))
-                .field("vib_accel_rms_total", round(vib_total_rms, 4))
-                .field("anomaly", int(app.vibration_analytics_objects[sensor_name].anomaly))
-                .field("anomaly_ratio", round(float(app.vibration_analytics_objects[sensor_name].anomaly_ratio), 4))
-                .field("model_avg", round(float(app.vibration_analytics_objects[sensor_name].model_avg), 4))
-                .field("z_score", round(float(app.vibration_analytics_objects[sensor_name].z_score), 4))
-                .field("z_score_thresh", round(float(app.vibration_analytics_objects[sensor_name].z_score_thresh), 4))
-                .time(
-                    time=datetime.fromtimestamp(int(data["TimeStamp"]) / 1000, UTC),
-                    write_precision="ms",
-                )
-            )
-
-            # store results in InfluxDB
-            write_to_influx(measurement, point)
+                except BrokenProcessPool as e:
+                    logger.error("Anomaly detection worker of %s stopped, restarting it. \
+                                    Error code/reason: %s", sensor_name, e)
+                    restart_analytics_worker(executor)
+                    results = NO_ANALYTICS_RESULTS
+                except Exception as e:
+                    logger.error("Anomaly detection of %s failed. Error code/reason: %s", 
+                                 sensor_name, e)
+                    results = NO_ANALYTICS_RESULTS
+
+            line = analytics_line
+            fields += results
+        # only store sensor data in InfluxDB (no analytics)
+        elif raw_line is not None:
+            line = raw_line
+        else:
+            return {"Message": "Sensor read successfully"}, 201
 
-    # POST request successfully processed
-    return {"Message": "Sensor read successfully"}, 201
+        # store results in InfluxDB
+        tags = (data["LineName"], data["MachineName"], sensor_name)
+        queue_to_influx(line.measurement, line.build(tags, fields, int(data["TimeStamp"])))
+
+        # POST request successfully processed
+        return {"Message": "Sensor read successfully"}, 201
+
+    return sensor_route
+
+
+# HTTP POST handler for data with generic sensor from machine
+app.add_api_route(
+    "/generic-sensor",
+    make_sensor_route("generic",
+                      app.generic_analytics_objects,
+                      app.generic_analytics_executors,
+                      app.generic_sensors_for_analytics_set,
+                      read_generic_sensor,
+                      SENSOR_ANALYTICS_LINE,
+                      GENERIC_SENSOR_LINE),
+    methods=["POST"],
+    name="sensor_data"
+)
+
+# HTTP POST handler for data from vibration sensor
+app.add_api_route(
+    "/vibration-sensor",
+    make_sensor_route("vibration",
+                      app.vibration_analytics_objects,
+                      app.vibration_analytics_executors,
+                      app.vibration_sensors_for_analytics_set,
+                      read_vibration_sensor,
+                      VIB_SENSOR_LINE),
+    methods=["POST"],
+    name="vibration_sensor_data"
+)
 
 # Main block to run the application using Uvicorn server
 if __name__ == "__main__":
 
-    uvicorn.run("app_fastapi:app", port=FLASK_PORT, host="0.0.0.0", reload=True)
+    uvicorn.run("app_fastapi:app", port=FLASK_PORT, host="0.0.0.0",
+                loop="uvloop", http="httptools", 
+                workers=UVICORN_WORKERS, reload=False)
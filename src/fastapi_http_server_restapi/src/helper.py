@@ -1,18 +1,129 @@
+import math
 import statistics
+import logging
+from collections import deque
+
+# escaping rules of InfluxDB line protocol (same as influxdb_client.Point)
+_MEASUREMENT_ESCAPE = str.maketrans({",": "\\,", " ": "\\ ",
+                                     "\n": "\\n", "\t": "\\t", "\r": "\\r"})
+_KEY_ESCAPE = str.maketrans({",": "\\,", "=": "\\=", " ": "\\ ",
+                             "\n": "\\n", "\t": "\\t", "\r": "\\r"})
+_STR_FIELD_ESCAPE = str.maketrans({'"': '\\"', "\\": "\\\\"})
+
+# variance of data model smaller than this fraction of mean^2 is only
+# rounding error of the incremental update and is treated as zero
+_VARIANCE_REL_EPS = 1e-14
+
+
+def _format_tag_value(value) -> bytes | None:
+    """Return escaped tag value, None if tag is to be skipped (None or empty value)"""
+    if value is None:
+        return None
+    value = str(value).translate(_KEY_ESCAPE)
+    if not value:
+        return None
+    # trailing backslash would escape the following separator
+    if value.endswith("\\"):
+        value += " "
+    return value.encode()
+
+
+def _format_field_value(value) -> bytes | None:
+    """Return field value formatted according to InfluxDB line protocol,
+    float values with 4 decimal places. 
+    None if field is to be skipped (None, NaN or infinite value)"""
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            return None
+        return b"%.4f" % value
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return b"true" if value else b"false"
+    if isinstance(value, int):
+        return b"%di" % value
+    return ('"' + str(value).translate(_STR_FIELD_ESCAPE) + '"').encode()
+
+
+class LineProtocolTemplate:
+    """
+        Data point in InfluxDB line protocol for one measurement with fixed
+        tag and field keys. Static parts of the line (measurement, keys,
+        separators) are escaped and encoded once, so for every data point
+        only the values are formatted.
+
+        measurement         name of measurement
+        tag_keys            names of tags, in order of tag values passed to `build`
+        field_keys          names of fields, in order of field values passed to `build`
+    """
+
+    def __init__(self, measurement: str, tag_keys: tuple, field_keys: tuple) -> None:
+        self._measurement = measurement
+        self._measurement_bytes = measurement.translate(_MEASUREMENT_ESCAPE).encode()
+        self._tag_prefixes = tuple(
+            ("," + key.translate(_KEY_ESCAPE) + "=").encode() for key in tag_keys
+        )
+        self._field_prefixes = tuple(
+            (key.translate(_KEY_ESCAPE) + "=").encode() for key in field_keys
+        )
+
+    @property
+    def measurement(self) -> str:
+        """return name of measurement"""
+        return self._measurement
+
+    def build(self, tag_values: tuple, field_values: tuple, timestamp: int) -> bytes | None:
+        """Return single data point as line protocol bytes. Like influxdb_client.Point,
+        tags with None or empty value and fields with None, NaN or infinite value 
+        are skipped. None is returned if no field is left.
+
+        Args:
+            tag_values (tuple): tag values, converted to str
+            field_values (tuple): field values (int, float, bool or str),
+                float values are written with 4 decimal places
+            timestamp (int): timestamp of data point, precision must match 
+                `write_precision` used when the line is written to InfluxDB
+        """
+        parts = [self._measurement_bytes]
+        for prefix, value in zip(self._tag_prefixes, tag_values):
+            value = _format_tag_value(value)
+            if value is not None:
+                parts.append(prefix)
+                parts.append(value)
+
+        separator = b" "
+        for prefix, value in zip(self._field_prefixes, field_values):
+            value = _format_field_value(value)
+            if value is not None:
+                parts.append(separator)
+                parts.append(prefix)
+                parts.append(value)
+                separator = b","
+        if separator == b" ":
+            return None
+
+        parts.append(b" %d" % timestamp)
+        return b"".join(parts)
+
 
 class AnomalyDetectionZscore:
     """
         Analyse real-time data from electrical device
         and apply z-score algorithm to detect anomalies
 
-        model_data          list where real-time (non anomalous) data are stored
+        model_data          moving window (deque) where real-time (non anomalous) data are stored
         model_size          definition how many data points should be in `model_data`
-        anomaly_list        list with anomaly detection results (1 and 0)
+        anomaly_list        moving window (deque) with anomaly detection results (1 and 0)
         anomaly_list_size  definition how many data points should be in `anomaly_list`
+        anomaly_count       number of anomalies (1) in `anomaly_list`
         anomaly_ratio       percentage of anomalous data in `anomaly_list`
         anomaly             result if current data point is anomaly (1) or not (0)
         model_avg           avarage mean of `model_data`
         model_std_dev       standard deviation of `model_data`
+        model_mean          running mean of `model_data` (Welford's algorithm)
+        model_m2            running sum of squared deviations from mean of `model_data`
+        model_updates       number of points replaced in `model_data` since mean and m2
+                            were last recalculated from all points
         z_score             calculated z-score value for single sensor data
         z_score_thresh      threshold above which sensor data is interpeted as anomalous
         name                name of the object/sensor on which the algorithm is applied
@@ -21,19 +132,24 @@ class AnomalyDetectionZscore:
     def __init__(self, name: str,
                  model_size: int, 
                  anomaly_list_size: int, 
+                 z_score_thresh: float,
                  logger) -> None:
-        self._model_data = []
+        self._model_data = deque(maxlen=model_size)
         self._model_size = model_size
-        self._anomaly_list = []
+        self._anomaly_list = deque(maxlen=anomaly_list_size)
         self._anomaly_list_size = anomaly_list_size
+        self._anomaly_count = 0
         self._anomaly_ratio = 0.0
         self._anomaly = 0
         self._model_avg = 0.0
         self._model_std_dev = 0.0
+        self._model_mean = 0.0
+        self._model_m2 = 0.0
+        self._model_updates = 0
         self._z_score = 0.0
-        self._z_score_thresh = 0.0
         self._name = name
         self._logger = logger
+        self.z_score_thresh = z_score_thresh
 
     # Read only wariables
     @property
@@ -74,7 +190,7 @@ class AnomalyDetectionZscore:
     @z_score_thresh.setter
     def z_score_thresh(self, z_score_threshold: float):
         if z_score_threshold == 0:
-            logger.error("Z-score threshold must be above zero")
+            self._logger.error("Z-score threshold must be above zero")
             self._z_score_thresh = 2.0
         else:
             self._z_score_thresh = z_score_threshold
@@ -82,12 +198,16 @@ class AnomalyDetectionZscore:
     def reset_algorithm(self) -> bool:
         """Reset data model in algorithm"""
 
-        self._model_data = []
-        self._anomaly_list = []
+        self._model_data.clear()
+        self._anomaly_list.clear()
+        self._anomaly_count = 0
         self._anomaly_ratio = 0.0
         self._anomaly = 0
         self._model_avg = 0.0
         self._model_std_dev = 0.0
+        self._model_mean = 0.0
+        self._model_m2 = 0.0
+        self._model_updates = 0
         self._z_score = 0.0
 
     def is_model_complete(self) -> bool:
@@ -106,12 +226,14 @@ class AnomalyDetectionZscore:
             if self.is_model_complete():
                 if len(self._anomaly_list) < self._anomaly_list_size:
                     self._anomaly_list.append(self._anomaly)
+                    self._anomaly_count += self._anomaly
                 else:
-                    self._anomaly_list.pop(0)
+                    # oldest result is dropped by deque itself (maxlen)
+                    self._anomaly_count += self._anomaly - self._anomaly_list[0]
                     self._anomaly_list.append(self._anomaly)
-                    self._anomaly_ratio = round(sum(self._anomaly_list) / self._anomaly_list_size, 3)
+                    self._anomaly_ratio = round(self._anomaly_count / self._anomaly_list_size, 3)
         except Exception as e:
-            logger.error(
+            self._logger.error(
                 f"Calculation `anomaly ratio of model` {self._name} failed. Error code/reason: {e}"
             )
 
@@ -120,36 +242,109 @@ class AnomalyDetectionZscore:
         Z-score algorithm to check if argument value is anomaly or not.
 
         Args:
-            value (any): input value (sensor data) to be evaluated by algorithm
+            value (any): input value (sensor data) to be evaluated by algorithm,
+                must not be negative (e.g. magnitude of sensor data)
         """
 
         try:
-            if self.is_model_complete():
+            model_size = self._model_size
+            if len(self._model_data) == model_size:
                 # recalculate the avg and std dev using only data points which are not anomaly
-                self._model_avg = round(abs(statistics.mean(self._model_data)), 3)
-                self._model_std_dev = abs(statistics.stdev(self._model_data))
+                variance = self._model_m2 / (model_size - 1)
+                if variance <= _VARIANCE_REL_EPS * self._model_mean * self._model_mean:
+                    variance = 0.0
+                self._model_avg = round(self._model_mean, 3)
+                self._model_std_dev = math.sqrt(variance) if variance > 0 else 0.0
 
                 # avoid division by zero
                 if self._model_std_dev == 0:
                     self._model_std_dev = 0.001
-                self._z_score = round((abs(value) - self._model_avg) / self._model_std_dev, 3)
+                self._z_score = round((value - self._model_avg) / self._model_std_dev, 3)
 
                 # Check if new point is beyond z-score threshold i.e. this is anomaly
-                if abs(self._z_score) > self.z_score_thresh:
+                if abs(self._z_score) > self._z_score_thresh:
                     # If anomaly, do not add to the model_data
                     self._anomaly = 1
                 else:
-                    # If not anomaly, add this point to data model
-                    # and delete the 1st point (moving window)
-                    self._model_data.pop(0)
+                    # If not anomaly, add this point to data model,
+                    # the 1st point is dropped by deque itself (moving window)
+                    # replace oldest point in mean and m2 (Welford, fixed window size)
+                    oldest = self._model_data[0]
+                    old_mean = self._model_mean
+                    self._model_mean += (value - oldest) / model_size
+                    self._model_m2 += (value - oldest) * (value - self._model_mean + oldest - old_mean)
                     self._model_data.append(value)
                     self._anomaly = 0
 
+                    # recalculate mean and m2 exactly from all points once the whole
+                    # window was replaced, so rounding errors of the updates do not accumulate
+                    self._model_updates += 1
+                    if self._model_updates == model_size:
+                        self._model_updates = 0
+                        # float(): statistics keeps int type for integer sensor data
+                        self._model_mean = float(statistics.mean(self._model_data))
+                        self._model_m2 = float(statistics.variance(self._model_data)) * (model_size - 1)
+
             else:
                 # build data model by appending incoming sensor data to the list `model_data`
+                # and add it to mean and m2 (Welford)
                 self._model_data.append(value)
+                delta = value - self._model_mean
+                self._model_mean += delta / len(self._model_data)
+                self._model_m2 += delta * (value - self._model_mean)
 
         except Exception as e:
-            logger.error(
+            self._logger.error(
                 f'Calculation `anomaly of model` "{self._name}" failed. Error code/reason: {e}'
-            )
\ No newline at end of file
+            )
+
+
+def update_analytics(analytics: AnomalyDetectionZscore, value: float) -> tuple:
+    """Apply z-score anomaly detection on value and return results 
+    in order of InfluxDB fields: anomaly, anomaly_ratio, model_avg, z_score, z_score_thresh
+
+    Args:
+        analytics (AnomalyDetectionZscore): anomaly detection object of the sensor
+        value (float): sensor data to be evaluated
+    """
+    analytics.check_if_anomaly(value)
+    analytics.calculate_anomaly_ratio()
+    return (analytics.anomaly,
+            float(analytics.anomaly_ratio),
+            float(analytics.model_avg),
+            float(analytics.z_score),
+            float(analytics.z_score_thresh))
+
+
+# anomaly detection objects owned by analytics worker process
+# key=(sensor group, sensor name);  value=object of class 'AnomalyDetectionZscore'
+_worker_analytics_objects = {}
+
+
+def init_analytics_worker(sensor_keys: list,
+                          model_size: int,
+                          anomaly_list_size: int,
+                          z_score_thresh: float) -> None:
+    """Create anomaly detection objects in analytics worker process
+
+    Args:
+        sensor_keys (list): (sensor group, sensor name) of sensors owned by this worker
+        model_size (int): number of points in data model
+        anomaly_list_size (int): number of points to calculate anomaly ratio
+        z_score_thresh (float): z-score threshold
+    """
+    logger = logging.getLogger(__name__)
+    for key in sensor_keys:
+        _worker_analytics_objects[key] = AnomalyDetectionZscore(
+            key[1], model_size, anomaly_list_size, z_score_thresh, logger
+        )
+
+
+def update_worker_analytics(sensor_key: tuple, value: float) -> tuple:
+    """Same as `update_analytics` for sensor owned by analytics worker process
+
+    Args:
+        sensor_key (tuple): (sensor group, sensor name)
+        value (float): sensor data to be evaluated
+    """
+    return update_analytics(_worker_analytics_objects[sensor_key], value)
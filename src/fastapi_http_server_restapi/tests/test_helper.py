@@ -0,0 +1,132 @@
+"""
+    Tests of z-score anomaly detection and line protocol in helper.py
+
+    Run from `src/fastapi_http_server_restapi`:
+        python -m unittest discover -s tests
+"""
+import logging
+import os
+import random
+import statistics
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from helper import AnomalyDetectionZscore, LineProtocolTemplate, update_analytics  # noqa: E402
+
+
+MODEL_SIZE = 25
+
+
+def create_analytics(z_score_thresh: float = 2.0) -> AnomalyDetectionZscore:
+    return AnomalyDetectionZscore("TestSensor", MODEL_SIZE, MODEL_SIZE,
+                                  z_score_thresh, logging.getLogger(__name__))
+
+
+class TestAnomalyDetectionZscore(unittest.TestCase):
+
+    def assert_model_matches_statistics(self, analytics, values):
+        """Feed values one by one and compare model avg / std dev
+        with statistics module applied on the same window"""
+        for value in values:
+            window = list(analytics._model_data)
+            analytics.check_if_anomaly(value)
+            analytics.calculate_anomaly_ratio()
+            if len(window) < MODEL_SIZE:
+                continue
+
+            expected_std_dev = statistics.stdev(window) or 0.001
+            self.assertEqual(analytics.model_avg, round(statistics.mean(window), 3))
+            self.assertAlmostEqual(analytics.model_std_dev, expected_std_dev,
+                                   delta=1e-9 * max(1.0, expected_std_dev))
+
+    def test_constant_input(self):
+        for value in (999.7188, 789.7476, 0.0, 12.5):
+            analytics = create_analytics()
+            self.assert_model_matches_statistics(analytics, [value] * 200)
+            self.assertEqual(analytics.anomaly, 0)
+            self.assertEqual(analytics.anomaly_ratio, 0.0)
+
+    def test_random_constant_input_is_not_anomaly(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            value = round(rng.uniform(0, 2000), 4)
+            analytics = create_analytics()
+            for _ in range(3 * MODEL_SIZE + 5):
+                analytics.check_if_anomaly(value)
+            self.assertEqual(analytics.anomaly, 0, value)
+            self.assertLess(abs(analytics.z_score), 1.0, value)
+
+    def test_noisy_input_matches_statistics(self):
+        rng = random.Random(1)
+        values = [1e6 + rng.gauss(0, 1) for _ in range(5000)]
+        self.assert_model_matches_statistics(create_analytics(z_score_thresh=1e9), values)
+
+    def test_outlier_is_anomaly_and_not_added_to_model(self):
+        analytics = create_analytics()
+        rng = random.Random(2)
+        for _ in range(MODEL_SIZE):
+            analytics.check_if_anomaly(10 + rng.random())
+        window = list(analytics._model_data)
+
+        analytics.check_if_anomaly(100.0)
+        self.assertEqual(analytics.anomaly, 1)
+        self.assertEqual(list(analytics._model_data), window)
+
+    def test_integer_input_gives_float_results(self):
+        line = LineProtocolTemplate(
+            "SingleSensorAnalytics",
+            ("sensor_name",),
+            ("anomaly", "anomaly_ratio", "model_avg", "z_score", "z_score_thresh")
+        )
+        analytics = create_analytics()
+        for i in range(20 * MODEL_SIZE):
+            results = update_analytics(analytics, [10, 12, 14, 12, 12][i % 5])
+            for value in results[1:]:
+                self.assertIsInstance(value, float, i)
+            if i >= MODEL_SIZE:
+                self.assertIn(b"model_avg=12.0000,", line.build(("S1",), results, 1))
+
+
+class TestLineProtocolTemplate(unittest.TestCase):
+
+    def setUp(self):
+        self.line = LineProtocolTemplate(
+            "GenericSensor",
+            ("line_name", "machine_name", "sensor_name"),
+            ("value", "anomaly")
+        )
+
+    def test_build(self):
+        self.assertEqual(
+            self.line.build(("L1", "M1", "S1"), (1.23456, 1), 1700000000000),
+            b"GenericSensor,line_name=L1,machine_name=M1,sensor_name=S1 "
+            b"value=1.2346,anomaly=1i 1700000000000"
+        )
+
+    def test_tag_value_escaping(self):
+        line = self.line.build(("L 1", "M1\nx,y=z\r\t", "S\\"), (1.0, 0), 1)
+        self.assertNotIn(b"\n", line.replace(b"\\n", b""))
+        self.assertEqual(
+            line,
+            b"GenericSensor,line_name=L\\ 1,machine_name=M1\\nx\\,y\\=z\\r\\t,"
+            b"sensor_name=S\\  value=1.0000,anomaly=0i 1"
+        )
+
+    def test_empty_tags_are_skipped(self):
+        self.assertEqual(
+            self.line.build(("", "M1", None), (1.0, 0), 1),
+            b"GenericSensor,machine_name=M1 value=1.0000,anomaly=0i 1"
+        )
+
+    def test_non_finite_fields_are_skipped(self):
+        self.assertEqual(
+            self.line.build(("L1", "M1", "S1"), (float("nan"), 1), 1),
+            b"GenericSensor,line_name=L1,machine_name=M1,sensor_name=S1 anomaly=1i 1"
+        )
+        self.assertIsNone(self.line.build(("L1", "M1", "S1"), (float("inf"), None), 1))
+
+
+if __name__ == "__main__":
+    unittest.main()